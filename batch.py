@@ -0,0 +1,140 @@
+#batch colour classification over stacked frames or lists of ROIs
+#
+#   result = classify_batch(frames, region_size=10)   # (N, H, W, 3) centre crops
+#   result = classify_batch([roi_a, roi_b, ...])      # any ROI sizes
+#   result.codes, result.confidences, result.stats
+#
+# Every ROI is converted with a single cvtColor call and averaged with one
+# reduction, then the hue/saturation windows from detect_color are applied
+# to the whole batch as array expressions.
+
+import json
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from colors import GREEN, NONE, RED, YELLOW
+
+# The hand-tuned windows shared by the detector scripts
+DEFAULT_THRESHOLDS = {
+    "sat_min": 50,
+    "val_min": 50,
+    "red_below": 10,
+    "red_above": 170,
+    "yellow": (20, 35),
+    "green": (35, 85),
+}
+
+# Calibrated profile written by calibrate.py, loaded by the detector at startup
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+# How many hue steps / saturation levels inside a window count as fully confident
+HUE_MARGIN = 5.0
+LEVEL_MARGIN = 50.0
+
+BatchResult = namedtuple("BatchResult", ["codes", "confidences", "stats"])
+
+
+def load_thresholds(path=PROFILE_PATH):
+    """Calibrated thresholds from path, falling back to the defaults"""
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if path and os.path.exists(path):
+        with open(path) as fh:
+            profile = json.load(fh)
+        for key, value in profile.items():
+            if key in thresholds:
+                thresholds[key] = tuple(value) if isinstance(value, list) else value
+        print(f"🎚️  Loaded thresholds from {path}")
+    return thresholds
+
+
+def save_thresholds(thresholds, path=PROFILE_PATH):
+    with open(path, "w") as fh:
+        json.dump({key: list(value) if isinstance(value, tuple) else value
+                   for key, value in thresholds.items()}, fh, indent=2)
+
+
+def center_rois(frames, region_size=10):
+    """Zero-copy centre crops of a stacked (N, H, W, 3) array"""
+    h, w = frames.shape[1:3]
+    cx, cy = w // 2, h // 2
+    return frames[:, cy - region_size:cy + region_size, cx - region_size:cx + region_size]
+
+
+def channel_stats(rois):
+    """Mean H, S, V per ROI as an (N, 3) float32 array
+
+    rois is a stacked (N, h, w, 3) BGR array or a list of BGR ROIs of any size.
+    """
+    if isinstance(rois, np.ndarray) and rois.ndim == 4:
+        n, h, w, _ = rois.shape
+        if n == 0 or h * w == 0:
+            return np.zeros((n, 3), np.float32)
+        pixels = np.ascontiguousarray(rois).reshape(1, n * h * w, 3)
+        hsv = cv2.cvtColor(pixels, cv2.COLOR_BGR2HSV).reshape(n, h * w, 3)
+        return hsv.mean(1, dtype=np.float32)
+
+    # Ragged list: convert all pixels at once, then reduce by segment
+    rois = [np.asarray(roi).reshape(-1, 3) for roi in rois]
+    sizes = np.array([len(roi) for roi in rois])
+    stats = np.zeros((len(rois), 3), np.float32)
+    if not sizes.sum():
+        return stats
+    pixels = np.concatenate(rois)[None]
+    hsv = cv2.cvtColor(pixels, cv2.COLOR_BGR2HSV)[0].astype(np.float32)
+    nonempty = sizes > 0
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))[nonempty]
+    stats[nonempty] = np.add.reduceat(hsv, starts, axis=0) / sizes[nonempty, None]
+    return stats
+
+
+def classify_stats(stats, thresholds=None):
+    """Vectorised detect_color rules over (N, 3) mean HSV -> (codes, confidences)"""
+    t = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+    # detect_color truncates the mean hue to an int before comparing
+    hue = np.floor(stats[:, 0])
+    sat = stats[:, 1]
+    val = stats[:, 2]
+
+    bright = (sat >= t["sat_min"]) & (val >= t["val_min"])
+    red = (hue < t["red_below"]) | (hue > t["red_above"])
+    yellow = (hue >= t["yellow"][0]) & (hue < t["yellow"][1])
+    green = (hue >= t["green"][0]) & (hue < t["green"][1])
+    codes = np.select([bright & red, bright & yellow, bright & green],
+                      [RED, YELLOW, GREEN], NONE).astype(np.int8)
+
+    # Distance from the decision boundary, in hue steps and S/V levels
+    hue_margin = np.select(
+        [red, yellow, green],
+        [np.maximum(t["red_below"] - hue, hue - t["red_above"]),
+         np.minimum(hue - t["yellow"][0], t["yellow"][1] - hue),
+         np.minimum(hue - t["green"][0], t["green"][1] - hue)],
+        # Outside every window: distance to the nearest window edge
+        np.min(np.abs(hue[:, None] - np.array(
+            [t["red_below"], t["red_above"], t["yellow"][0], t["yellow"][1],
+             t["green"][0], t["green"][1]], np.float32)), axis=1))
+    level_margin = np.minimum(sat - t["sat_min"], val - t["val_min"])
+
+    coloured = codes != NONE
+    confidences = np.where(
+        coloured,
+        np.minimum(hue_margin / HUE_MARGIN, level_margin / LEVEL_MARGIN),
+        # NONE is certain if too dark/grey, or well outside every window
+        np.maximum(-level_margin / LEVEL_MARGIN, np.where(bright, hue_margin / HUE_MARGIN, 0)))
+    return codes, np.clip(confidences, 0.0, 1.0).astype(np.float32)
+
+
+def classify_batch(frames_or_rois, region_size=None, thresholds=None):
+    """Classify a batch in one pass -> BatchResult(codes, confidences, stats)
+
+    With region_size set, frames_or_rois is a stacked (N, H, W, 3) array and
+    the centre (2 * region_size)^2 crop of every frame is used, like detect_color.
+    """
+    rois = frames_or_rois
+    if region_size is not None:
+        rois = center_rois(np.asarray(frames_or_rois), region_size)
+    stats = channel_stats(rois)
+    codes, confidences = classify_stats(stats, thresholds)
+    return BatchResult(codes, confidences, stats)
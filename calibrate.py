@@ -0,0 +1,200 @@
+#threshold calibration from labelled clips
+#
+#   python calibrate.py ingest clips/ hist.npz      (clips/RED/*.raw|*.mp4, clips/GREEN/..., clips/NONE/...)
+#   python calibrate.py search hist.npz [--profile thresholds.json]
+#
+# Ingest reduces every frame to the mean HSV of its centre ROI (exactly what
+# detect_color looks at) and counts them into one 3D histogram per label:
+# integer hue x saturation bin x value bin. Search then turns the histograms
+# into cumulative tables, so scoring a candidate threshold set is a handful
+# of table lookups instead of re-running any frames.
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from batch import DEFAULT_THRESHOLDS, PROFILE_PATH, center_rois, channel_stats, save_thresholds
+from colors import COLOR_CODES, COLOR_NAMES, GREEN, NONE, RED, YELLOW
+
+HUE_BINS = 180
+LEVEL_STEP = 5  # saturation/value resolution; thresholds are searched on this grid
+LEVEL_BINS = 256 // LEVEL_STEP + 1
+
+
+def _open_clip(path):
+    if path.endswith(".raw"):
+        from replay import ReplayCapture
+        return ReplayCapture(path)
+    return cv2.VideoCapture(path)
+
+
+def clip_stats(path, region_size=10, batch=256):
+    """Mean centre-ROI HSV of every frame in a clip, as (N, 3)"""
+    cap = _open_clip(path)
+    rois, stats = [], []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        rois.append(center_rois(frame[None], region_size)[0].copy())
+        if len(rois) == batch:
+            stats.append(channel_stats(np.stack(rois)))
+            rois = []
+    if rois:
+        stats.append(channel_stats(np.stack(rois)))
+    cap.release()
+    return np.concatenate(stats) if stats else np.zeros((0, 3), np.float32)
+
+
+def histogram(stats):
+    """Count (N, 3) mean HSV into a (hue, sat bin, val bin) histogram"""
+    hue = np.clip(np.floor(stats[:, 0]).astype(np.int64), 0, HUE_BINS - 1)
+    sat = np.floor(stats[:, 1]).astype(np.int64) // LEVEL_STEP
+    val = np.floor(stats[:, 2]).astype(np.int64) // LEVEL_STEP
+    flat = (hue * LEVEL_BINS + sat) * LEVEL_BINS + val
+    counts = np.bincount(flat, minlength=HUE_BINS * LEVEL_BINS * LEVEL_BINS)
+    return counts.reshape(HUE_BINS, LEVEL_BINS, LEVEL_BINS).astype(np.uint32)
+
+
+def ingest(directory, out_path):
+    """Build one histogram per label from clips/<LABEL>/* and save them"""
+    hists = np.zeros((len(COLOR_NAMES), HUE_BINS, LEVEL_BINS, LEVEL_BINS), np.uint32)
+    for name in COLOR_NAMES:
+        for path in sorted(glob.glob(os.path.join(directory, name, "*"))):
+            stats = clip_stats(path)
+            hists[COLOR_CODES[name]] += histogram(stats)
+            print(f"📥 {name:<6} {os.path.basename(path)}: {len(stats)} frames")
+    if not hists.any():
+        raise ValueError(f"No labelled clips found under {directory}")
+    np.savez_compressed(out_path, hists=hists, level_step=LEVEL_STEP)
+    return hists
+
+
+class HistogramScorer:
+    """Score threshold sets against per-label histograms in O(1) lookups"""
+
+    def __init__(self, hists, wrong_color_penalty=2.0):
+        self.wrong_color_penalty = wrong_color_penalty
+        # Suffix sums over sat/val: [s, v] = frames with sat bin >= s and val bin >= v
+        bright = hists.astype(np.int64)[:, :, ::-1, ::-1].cumsum(2).cumsum(3)[:, :, ::-1, ::-1]
+        # Prefix sum over hue: [h] = frames with hue < h
+        self.table = np.zeros((len(hists), HUE_BINS + 1) + bright.shape[2:], np.int64)
+        self.table[:, 1:] = bright.cumsum(1)
+        self.totals = hists.reshape(len(hists), -1).sum(1).astype(np.int64)
+
+    def confusion(self, t):
+        """(labels x predicted) frame counts for thresholds t"""
+        s = int(np.ceil(t["sat_min"] / LEVEL_STEP))
+        v = int(np.ceil(t["val_min"] / LEVEL_STEP))
+        column = self.table[:, :, min(s, LEVEL_BINS - 1), min(v, LEVEL_BINS - 1)]
+
+        def count(lo, hi):
+            lo, hi = max(lo, 0), min(hi, HUE_BINS)
+            return column[:, hi] - column[:, lo] if hi > lo else 0
+
+        matrix = np.zeros((len(column), len(COLOR_NAMES)), np.int64)
+        # Integer hue: "hue > red_above" is "hue >= red_above + 1"
+        matrix[:, RED] = count(0, t["red_below"]) + count(int(t["red_above"]) + 1, HUE_BINS)
+        matrix[:, YELLOW] = count(*t["yellow"])
+        matrix[:, GREEN] = count(*t["green"])
+        matrix[:, NONE] = self.totals - matrix[:, RED] - matrix[:, YELLOW] - matrix[:, GREEN]
+        return matrix
+
+    def score(self, t):
+        """Correct frames minus a penalty for announcing the wrong colour"""
+        matrix = self.confusion(t)
+        correct = np.trace(matrix)
+        coloured = matrix[:, [RED, YELLOW, GREEN]].sum() - sum(matrix[c, c] for c in (RED, YELLOW, GREEN))
+        return correct - self.wrong_color_penalty * coloured
+
+    def accuracy(self, t):
+        return np.trace(self.confusion(t)) / max(self.totals.sum(), 1)
+
+
+def _valid(t):
+    y0, y1 = t["yellow"]
+    g0, g1 = t["green"]
+    return t["red_below"] <= y0 <= y1 <= g0 <= g1 <= t["red_above"] + 1
+
+
+def search(scorer, start=None, rounds=10):
+    """Coordinate descent over every threshold until nothing improves"""
+    best = dict(DEFAULT_THRESHOLDS if start is None else start)
+    best_score = scorer.score(best)
+    levels = range(0, 256, LEVEL_STEP)
+    hues = range(0, HUE_BINS + 1)
+
+    # (key, index into a pair or None, candidate values)
+    axes = [("sat_min", None, levels), ("val_min", None, levels),
+            ("red_below", None, hues), ("red_above", None, hues),
+            ("yellow", 0, hues), ("yellow", 1, hues),
+            ("green", 0, hues), ("green", 1, hues)]
+    evaluated = 0
+    for _ in range(rounds):
+        improved = False
+        for key, index, values in axes:
+            for value in values:
+                candidate = dict(best)
+                if index is None:
+                    candidate[key] = value
+                else:
+                    pair = list(candidate[key])
+                    pair[index] = value
+                    candidate[key] = tuple(pair)
+                if not _valid(candidate):
+                    continue
+                evaluated += 1
+                score = scorer.score(candidate)
+                if score > best_score:
+                    best, best_score, improved = candidate, score, True
+        if not improved:
+            break
+    return best, evaluated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the HSV thresholds from labelled clips")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ing = sub.add_parser("ingest", help="build per-label histograms from clip folders")
+    ing.add_argument("clips")
+    ing.add_argument("histograms")
+
+    srch = sub.add_parser("search", help="find the best thresholds and write a profile")
+    srch.add_argument("histograms")
+    srch.add_argument("--profile", default=None, help="output path (default: thresholds.json)")
+    srch.add_argument("--penalty", type=float, default=2.0,
+                      help="cost of one wrong-colour frame relative to a missed one")
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        ingest(args.clips, args.histograms)
+        print(f"✅ Histograms written to {args.histograms}")
+        return
+
+    data = np.load(args.histograms)
+    if int(data["level_step"]) != LEVEL_STEP:
+        raise ValueError("Histograms were built with a different level step")
+    scorer = HistogramScorer(data["hists"], args.penalty)
+
+    start = time.perf_counter()
+    best, evaluated = search(scorer)
+    elapsed = time.perf_counter() - start
+    print(f"🔎 {evaluated} candidates in {elapsed:.2f}s "
+          f"({elapsed / max(evaluated, 1) * 1e6:.1f} us each)")
+    print(f"   default accuracy {scorer.accuracy(DEFAULT_THRESHOLDS) * 100:.1f}%, "
+          f"calibrated {scorer.accuracy(best) * 100:.1f}%")
+    for key, value in best.items():
+        print(f"   {key}: {value}")
+
+    profile = args.profile or PROFILE_PATH
+    save_thresholds(best, profile)
+    print(f"✅ Profile written to {profile}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#cheap change detection to skip classification on unchanged frames
+#
+# Only the centre patch that detect_color reads is watched: it is shrunk to
+# a tiny colour thumbnail and compared with the patch of the last
+# classified frame. While no thumbnail cell differs by more than the
+# threshold the caller can reuse its last colour instead of converting and
+# classifying the patch again. Watching the patch rather than the whole
+# frame keeps a lamp switch visible at any resolution.
+
+import cv2
+import numpy as np
+
+
+class ChangeGate:
+    """Decide per frame whether the detection patch changed enough to re-classify"""
+
+    def __init__(self, threshold=12.0, region_size=10, size=(4, 4), max_skip=30):
+        self.threshold = threshold  # largest per-cell channel difference (0-255)
+        self.region_size = region_size  # half-width of the patch, as in detect_color
+        self.size = size
+        self.max_skip = max_skip  # force a refresh so slow drift is not missed
+
+        # Reused buffers, no allocation per frame
+        self.thumb = np.zeros((size[1], size[0], 3), np.uint8)
+        self.previous = np.zeros_like(self.thumb)
+        self.diff = np.zeros_like(self.thumb)
+        self.has_previous = False
+        self.run_length = 0
+
+        self.frames = 0
+        self.skipped = 0
+        self.last_difference = 0.0
+
+    def changed(self, frame):
+        """True if frame must be classified, False if the last result still holds"""
+        self.frames += 1
+        h, w = frame.shape[:2]
+        cx, cy, r = w // 2, h // 2, self.region_size
+        region = frame[cy - r:cy + r, cx - r:cx + r]
+        if region.size == 0:
+            return True
+        # Compare in colour: a red -> green swap can keep the same brightness
+        cv2.resize(region, self.size, dst=self.thumb, interpolation=cv2.INTER_AREA)
+
+        if self.has_previous and self.run_length < self.max_skip:
+            cv2.absdiff(self.thumb, self.previous, dst=self.diff)
+            # Max, not mean: a lamp edge moving through the patch changes a few cells
+            self.last_difference = float(self.diff.max())
+            if self.last_difference < self.threshold:
+                self.run_length += 1
+                self.skipped += 1
+                return False
+
+        # Keep the thumbnail of the last classified frame as the reference
+        self.thumb, self.previous = self.previous, self.thumb
+        self.has_previous = True
+        self.run_length = 0
+        return True
+
+    @property
+    def skip_ratio(self):
+        """Fraction of frames that reused the previous result"""
+        return self.skipped / self.frames if self.frames else 0.0
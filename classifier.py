@@ -0,0 +1,184 @@
+#nearest-centroid colour classifier trained from labelled patches
+#
+# train:  python classifier.py train patches/ model.npz
+#         (patches/RED/*.png, patches/YELLOW/*.png, patches/GREEN/*.png, patches/NONE/*.png)
+# bench:  python classifier.py bench model.npz
+#
+# Features are the circular mean of hue plus mean saturation and value,
+# so red on both sides of the hue wrap lands in one cluster and the
+# orange-ish yellows that fall in the 10-20 hue gap get a real class.
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from batch import classify_batch, load_thresholds
+from colors import COLOR_CODES, COLOR_NAMES, NONE
+
+# Hue is 0-179 in OpenCV; precompute its position on the unit circle
+_HUE_ANGLE = np.arange(256) * (2 * np.pi / 180)
+HUE_COS = np.cos(_HUE_ANGLE).astype(np.float32)
+HUE_SIN = np.sin(_HUE_ANGLE).astype(np.float32)
+
+
+def patch_features(patches):
+    """(N, H, W, 3) BGR uint8 patches -> (N, 4) float32 features
+
+    [cos(hue), sin(hue), saturation, value], hue weighted by saturation
+    so grey pixels do not pull the mean.
+    """
+    patches = np.asarray(patches)
+    n, h, w, _ = patches.shape
+    # One cvtColor call for the whole batch
+    hsv = cv2.cvtColor(patches.reshape(n * h, w, 3), cv2.COLOR_BGR2HSV).reshape(n, h * w, 3)
+    hue = hsv[:, :, 0]
+    sat = hsv[:, :, 1].astype(np.float32) * (1 / 255)
+    val = hsv[:, :, 2].astype(np.float32) * (1 / 255)
+
+    weight = sat + 1e-3
+    cos = (HUE_COS[hue] * weight).sum(1)
+    sin = (HUE_SIN[hue] * weight).sum(1)
+    norm = np.sqrt(cos * cos + sin * sin) + 1e-6
+    mean_sat = sat.mean(1)
+
+    features = np.empty((n, 4), np.float32)
+    # Scale the hue direction by saturation: unsaturated patches collapse to the origin
+    features[:, 0] = cos / norm * mean_sat
+    features[:, 1] = sin / norm * mean_sat
+    features[:, 2] = mean_sat
+    features[:, 3] = val.mean(1)
+    return features
+
+
+class CentroidClassifier:
+    """Nearest-centroid model: one feature vector per colour class"""
+
+    def __init__(self, codes, centroids):
+        self.codes = np.asarray(codes, np.int8)
+        self.centroids = np.asarray(centroids, np.float32)
+
+    @classmethod
+    def train(cls, patches, labels):
+        """Fit from (N, H, W, 3) patches and colour names or codes"""
+        features = patch_features(patches)
+        labels = np.array([COLOR_CODES[l] if isinstance(l, str) else l for l in labels])
+        codes = np.unique(labels)
+        # Without a NONE centroid every frame is the nearest colour and gets announced
+        if NONE not in codes:
+            raise ValueError("Training data needs NONE patches (background, unlit lamps)")
+        centroids = np.stack([features[labels == c].mean(0) for c in codes])
+        return cls(codes, centroids)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["codes"], data["centroids"])
+
+    def save(self, path):
+        np.savez(path, codes=self.codes, centroids=self.centroids)
+
+    def predict_features(self, features):
+        """Vectorised prediction: returns (codes, confidences)"""
+        # (N, 1, F) - (1, K, F) -> (N, K) squared distances
+        diff = features[:, None, :] - self.centroids[None, :, :]
+        dist = np.einsum("nkf,nkf->nk", diff, diff)
+        order = np.argsort(dist, axis=1)
+        rows = np.arange(len(features))
+        best = dist[rows, order[:, 0]]
+        if dist.shape[1] > 1:
+            second = dist[rows, order[:, 1]]
+            confidence = 1.0 - np.sqrt(best) / (np.sqrt(second) + 1e-6)
+        else:
+            confidence = np.ones(len(features), np.float32)
+        return self.codes[order[:, 0]], confidence.astype(np.float32)
+
+    def predict(self, patches):
+        """(N, H, W, 3) BGR patches -> (codes, confidences)"""
+        return self.predict_features(patch_features(patches))
+
+    def predict_name(self, patch):
+        """Single patch -> colour name, for drop-in use in detect_color"""
+        codes, _ = self.predict(patch[None])
+        return COLOR_NAMES[codes[0]]
+
+
+def load_patches(directory, size=20):
+    """Read patches/<LABEL>/*.png into (N, size, size, 3) plus labels"""
+    patches, labels = [], []
+    for name in COLOR_NAMES:
+        for path in sorted(glob.glob(os.path.join(directory, name, "*"))):
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            patches.append(cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA))
+            labels.append(name)
+    if not patches:
+        raise ValueError(f"No labelled patches found under {directory}")
+    return np.stack(patches), labels
+
+
+def bench(model, batch=256, size=20, repeats=20):
+    """Compare per-patch cost of the classifier with the threshold windows"""
+    rng = np.random.default_rng(0)
+    patches = rng.integers(0, 256, (batch, size, size, 3), dtype=np.uint8)
+    thresholds = load_thresholds()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for patch in patches[:32]:
+            classify_batch(patch[None], thresholds=thresholds)
+    windows = (time.perf_counter() - start) / (repeats * 32)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        classify_batch(patches, thresholds=thresholds)
+    windows_batched = (time.perf_counter() - start) / (repeats * batch)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(patches)
+    batched = (time.perf_counter() - start) / (repeats * batch)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for patch in patches[:32]:
+            model.predict(patch[None])
+    single = (time.perf_counter() - start) / (repeats * 32)
+
+    print(f"⏱️  thresholds x1   : {windows * 1e6:8.1f} us/patch")
+    print(f"⏱️  thresholds x{batch:<4d}: {windows_batched * 1e6:8.1f} us/patch")
+    print(f"⏱️  classifier x1   : {single * 1e6:8.1f} us/patch")
+    print(f"⏱️  classifier x{batch:<4d}: {batched * 1e6:8.1f} us/patch")
+    return windows, windows_batched, single, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or benchmark the colour classifier")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="fit centroids from labelled patch folders")
+    train.add_argument("patches")
+    train.add_argument("model")
+
+    timing = sub.add_parser("bench", help="compare against the batch threshold windows")
+    timing.add_argument("model")
+
+    args = parser.parse_args()
+    if args.command == "train":
+        patches, labels = load_patches(args.patches)
+        model = CentroidClassifier.train(patches, labels)
+        predicted, _ = model.predict(patches)
+        truth = np.array([COLOR_CODES[l] for l in labels])
+        model.save(args.model)
+        print(f"✅ Trained on {len(labels)} patches, "
+              f"training accuracy {np.mean(predicted == truth) * 100:.1f}%")
+    else:
+        bench(CentroidClassifier.load(args.model))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#pre-event ring buffer with background clip export on colour transitions
+#
+# The last few seconds of frames are kept JPEG-compressed in a ring trimmed
+# by timestamp, so memory stays fixed however long the drive. When a watched
+# transition (RED -> GREEN by default) has held for a few frames, the ring
+# plus the following seconds are handed to a writer thread that turns them
+# into a video file. Frames are placed by capture time (repeated to fill
+# gaps), so a clip plays in real time even when duty cycling thins the
+# frames. The capture loop only ever encodes a JPEG and appends to a queue
+# without blocking; if the writer falls behind, frames are dropped and
+# counted instead. Clip start/end messages are never dropped, so every
+# opened file is closed.
+
+import collections
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+_END = object()
+
+
+class PreEventRecorder:
+    """Keep recent frames and export clips around confirmed transitions"""
+
+    def __init__(self, out_dir="incidents", seconds_before=5.0, seconds_after=5.0,
+                 fps=30.0, quality=80, transitions=(("RED", "GREEN"),),
+                 confirm_frames=3, queue_size=512):
+        self.out_dir = out_dir
+        self.seconds_before = seconds_before
+        self.seconds_after = seconds_after
+        self.fps = fps  # output rate of the clip files
+        self.transitions = set(transitions)
+        self.confirm_frames = confirm_frames
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.ring = collections.deque()  # (t, jpeg) from the last seconds_before
+        self.active = []  # [clip_id, end_time] of clips still collecting frames
+        self.clips_started = 0
+        self.dropped = 0
+
+        # Colour debounce for confirming a transition
+        self.stable_color = None
+        self.candidate = None
+        self.candidate_count = 0
+
+        # Unbounded so start/end always arrive in order; frames take a slot first
+        self.queue = queue.Queue()
+        self.frame_slots = threading.Semaphore(queue_size)
+        self.writer = threading.Thread(target=self._write_loop, name="clip-writer", daemon=True)
+        self.writer.start()
+
+    def update(self, frame, color, t=None):
+        """Add one frame and its detected colour; call once per captured frame"""
+        t = time.time() if t is None else t
+        ok, jpeg = cv2.imencode(".jpg", frame, self.encode_params)
+        if not ok:
+            return
+        item = (t, jpeg)
+        self.ring.append(item)
+        # A time span, not a frame count: the frame rate varies under duty cycling
+        while self.ring[0][0] < t - self.seconds_before:
+            self.ring.popleft()
+
+        # Feed clips that are still in their post-event window
+        if self.active:
+            for clip in self.active:
+                self._put_frame(clip[0], item)
+            finished = [clip for clip in self.active if t >= clip[1]]
+            for clip in finished:
+                self.queue.put(("end", clip[0], None))
+                self.active.remove(clip)
+
+        self._observe(color, t)
+
+    def _observe(self, color, t):
+        if color == "NONE":
+            return
+        if color == self.candidate:
+            self.candidate_count += 1
+        else:
+            self.candidate, self.candidate_count = color, 1
+        if self.candidate_count < self.confirm_frames or color == self.stable_color:
+            return
+        previous, self.stable_color = self.stable_color, color
+        if (previous, color) in self.transitions:
+            self.trigger(f"{previous}-{color}", t)
+
+    def trigger(self, label, t=None):
+        """Start a clip: the current ring now, the next seconds as they arrive"""
+        t = time.time() if t is None else t
+        self.clips_started += 1
+        clip_id = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(t))}_{label}_{self.clips_started}"
+        print(f"🎬 Saving clip {clip_id}")
+        self.queue.put(("start", clip_id, list(self.ring)))
+        self.active.append([clip_id, t + self.seconds_after])
+
+    def _put_frame(self, clip_id, item):
+        # Only frames are droppable; a full writer backlog costs footage, not files
+        if self.frame_slots.acquire(blocking=False):
+            self.queue.put(("frame", clip_id, item))
+        else:
+            self.dropped += 1
+
+    def _write_loop(self):
+        writers = {}
+        while True:
+            message = self.queue.get()
+            if message is _END:
+                break
+            kind, clip_id, payload = message
+            if kind == "frame":
+                self.frame_slots.release()
+            try:
+                if kind == "start":
+                    writers[clip_id] = {"writer": None, "slot": None, "last": None}
+                    for item in payload:
+                        self._write(writers[clip_id], clip_id, item)
+                elif kind == "frame" and clip_id in writers:
+                    self._write(writers[clip_id], clip_id, payload)
+                elif kind == "end" and clip_id in writers:
+                    self._finish(writers.pop(clip_id))
+                    print(f"💾 Clip written: {clip_id}")
+            except Exception as e:
+                print(f"Clip writer error: {e}")
+        for state in writers.values():
+            self._finish(state)
+
+    def _write(self, state, clip_id, item):
+        """Show the previous frame until this one's timestamp, on a 1 / fps grid"""
+        t, jpeg = item
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if state["writer"] is None:
+            h, w = frame.shape[:2]
+            path = os.path.join(self.out_dir, f"{clip_id}.mp4")
+            state["writer"] = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (w, h))
+            state["slot"] = t
+        else:
+            while state["slot"] < t:
+                state["writer"].write(state["last"])
+                state["slot"] += 1.0 / self.fps
+        state["last"] = frame
+
+    def _finish(self, state):
+        if state["writer"] is None:
+            return
+        state["writer"].write(state["last"])
+        state["writer"].release()
+
+    def close(self):
+        """Finish open clips early and wait for the writer to drain"""
+        for clip in self.active:
+            self.queue.put(("end", clip[0], None))
+        self.active = []
+        self.queue.put(_END)
+        self.writer.join()
+        if self.dropped:
+            print(f"⚠️  {self.dropped} clip frames dropped (writer too slow)")
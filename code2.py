@@ -1,31 +1,64 @@
 import cv2
 import pyttsx3
 import time
-import numpy as np
+import argparse
 import threading
 
+from batch import classify_batch, load_thresholds
+from change_gate import ChangeGate
+from colors import COLOR_NAMES
+from pipeline import Pipeline, detector_stages, frames_in_flight, load_layout
+from timeline import EventTimeline
+
 class TrafficLightDetector:
-    def __init__(self):
-        # Initialize text-to-speech engine
-        self.engine = pyttsx3.init()
+    def __init__(self, cap=None, timeline=None, classifier=None, gate=None, duty=None,
+                 recorder=None, engine=None, show=True):
+        # Initialize text-to-speech engine (or use any object with say/runAndWait)
+        self.engine = engine if engine is not None else pyttsx3.init()
         self.engine.setProperty('rate', 150)
         self.engine.setProperty('volume', 0.8)
+
+        # show=False runs the loop headless (no window, no ESC key)
+        self.show = show
         
-        # Camera setup
-        self.cap = cv2.VideoCapture(0)
+        # Camera setup (any object with the cv2.VideoCapture read/release API)
+        if cap is None:
+            cap = cv2.VideoCapture(0)
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 360)
+        self.cap = cap
         if not self.cap.isOpened():
             raise Exception("Could not open camera")
-            
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 360)
         
         # Voice control variables
         self.last_spoken_color = ""
         self.last_speak_time = 0
         self.repeat_delay = 3  # Repeat every 3 seconds
         self.current_display_color = "NONE"
+        self.current_confidence = 0.0
         self.speaking = False
         self.voice_queue = []
+
+        # Per-frame history and colour transition index
+        self.timeline = timeline if timeline is not None else EventTimeline()
+
+        # Optional trained model (classifier.py) replacing the hue windows
+        self.classifier = classifier
+
+        # Hue/saturation windows, calibrated by calibrate.py if a profile exists
+        self.thresholds = load_thresholds()
+
+        # Optional ChangeGate (change_gate.py) skipping classification of an unchanged patch
+        self.gate = gate
+
+        # Optional DutyCycler (duty_cycle.py) lowering the rate with no light in view
+        self.duty = duty
+        if duty is not None:
+            # Probe for lamps in the same (possibly calibrated) hue windows
+            duty.set_thresholds(self.thresholds)
+
+        # Optional PreEventRecorder (clip_recorder.py) saving footage around transitions
+        self.recorder = recorder
         
     def speak_color_threaded(self, color):
         """Speak in a separate thread to avoid blocking"""
@@ -34,6 +67,7 @@ class TrafficLightDetector:
             
         self.speaking = True
         try:
+            self.timeline.announce(time.time(), color)
             self.engine.say(color)
             self.engine.runAndWait()
             self.last_spoken_color = color
@@ -46,34 +80,24 @@ class TrafficLightDetector:
     
     def detect_color(self, frame):
         """Simple color detection based on hue"""
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
         h, w, _ = frame.shape
         cx, cy = w // 2, h // 2
 
         # Use 10x10 region for stable detection
         region_size = 10
-        region = hsv[cy-region_size:cy+region_size, cx-region_size:cx+region_size]
+        region = frame[cy-region_size:cy+region_size, cx-region_size:cx+region_size]
         
         if region.size == 0:
+            self.current_confidence = 0.0
             return "NONE"
 
-        hue = int(np.mean(region[:,:,0]))
-        saturation = np.mean(region[:,:,1])
-        value = np.mean(region[:,:,2])
-        
-        # Only detect colors if saturation and value are sufficient
-        if saturation < 50 or value < 50:
-            return "NONE"
-            
-        # Simple hue-based color detection
-        if hue < 10 or hue > 170:
-            return "RED"
-        elif 20 <= hue < 35:
-            return "YELLOW"
-        elif 35 <= hue < 85:
-            return "GREEN"
+        # Only the centre patch is converted to HSV
+        if self.classifier is not None:
+            codes, confidences = self.classifier.predict(region[None])
         else:
-            return "NONE"
+            codes, confidences, _ = classify_batch(region[None], thresholds=self.thresholds)
+        self.current_confidence = float(confidences[0])
+        return COLOR_NAMES[codes[0]]
     
     def should_speak(self, current_color):
         """Determine if we should speak now"""
@@ -158,18 +182,31 @@ class TrafficLightDetector:
         
         try:
             while True:
-                ret, frame = self.cap.read()
+                if self.duty is not None:
+                    ret, frame = self.duty.read(self.cap)
+                else:
+                    ret, frame = self.cap.read()
                 if not ret:
                     print("Failed to grab frame")
                     break
+                raw = frame
 
+                start = time.perf_counter()
                 # Flip frame horizontally for mirror effect
                 frame = cv2.flip(frame, 1)
                 h, w, _ = frame.shape
                 cx, cy = w // 2, h // 2
 
-                # Detect color
-                self.current_display_color = self.detect_color(frame)
+                # Detect color (an unchanged centre patch keeps the last result)
+                if self.gate is None or self.gate.changed(frame):
+                    self.current_display_color = self.detect_color(frame)
+                self.timeline.record(time.time(), self.current_display_color,
+                                     self.current_confidence,
+                                     latency=time.perf_counter() - start)
+                if self.duty is not None:
+                    self.duty.update(frame, self.cap, self.current_display_color)
+                if self.recorder is not None:
+                    self.recorder.update(raw, self.current_display_color)
 
                 # VOICE LOGIC - Check if we should speak
                 if self.should_speak(self.current_display_color) and not self.speaking:
@@ -182,6 +219,8 @@ class TrafficLightDetector:
                     speech_thread.daemon = True
                     speech_thread.start()
 
+                if not self.show:
+                    continue
                 # Draw interface
                 self.draw_interface(frame, self.current_display_color, cx, cy)
                 cv2.imshow("Traffic Light Detector - FIXED REPEAT", frame)
@@ -195,17 +234,90 @@ class TrafficLightDetector:
             print(f"Error: {e}")
         finally:
             self.cleanup()
+
+    def run_pipeline(self, layout=None):
+        """Detection loop as a stage pipeline (see pipeline.py for the layout)"""
+        print("🚦 Starting Traffic Light Detection (pipeline)...")
+        print("Press ESC to exit")
+        self.last_speak_time = time.time() - self.repeat_delay  # Force immediate first speak
+        pipeline = Pipeline(detector_stages(self), layout)
+        try:
+            print(pipeline.run())
+        except Exception as e:
+            print(f"Error: {e}")
+        finally:
+            self.cleanup()
     
     def cleanup(self):
         """Clean up resources"""
         self.cap.release()
-        cv2.destroyAllWindows()
+        if self.show:
+            cv2.destroyAllWindows()
+        self.timeline.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        print(self.timeline.summary())
+        if self.gate is not None:
+            print(f"⏭️  Skipped {self.gate.skip_ratio * 100:.1f}% of frames as unchanged")
+        if self.duty is not None:
+            print(self.duty.report())
         print("Cleanup completed")
 
 def main():
+    parser = argparse.ArgumentParser(description="Traffic light colour detector")
+    parser.add_argument("recording", nargs="?",
+                        help="raw recording from replay.py to use instead of the camera")
+    parser.add_argument("--pipe", metavar="PATH",
+                        help="read raw BGR frames from a named pipe, or - for stdin")
+    parser.add_argument("--size", default="640x480",
+                        help="frame size of --pipe input, e.g. 640x360")
+    parser.add_argument("--classifier", help="model trained with classifier.py")
+    parser.add_argument("--change-gate", action="store_true",
+                        help="reuse the last colour while the centre patch is unchanged")
+    parser.add_argument("--duty-cycle", action="store_true",
+                        help="lower the frame rate while no light candidate is visible")
+    parser.add_argument("--clips", metavar="DIR",
+                        help="save footage around RED -> GREEN transitions to DIR")
+    parser.add_argument("--pipeline", metavar="LAYOUT",
+                        help="run the stage pipeline with this JSON thread layout")
+    parser.add_argument("--timeline", metavar="DIR",
+                        help="roll per-frame results and transitions to .npz files in DIR")
+    args = parser.parse_args()
+
     try:
-        detector = TrafficLightDetector()
-        detector.run()
+        layout = load_layout(args.pipeline) if args.pipeline else None
+        cap = None
+        if args.recording:
+            # Replay a raw recording made with replay.py instead of the camera
+            from replay import ReplayCapture
+            cap = ReplayCapture(args.recording, realtime=True)
+        elif args.pipe:
+            # Sit at the end of an external ffmpeg/GStreamer decode pipeline
+            from pipe_source import RawPipeCapture, parse_size
+            width, height = parse_size(args.size)
+            # Queued and worker stages still hold earlier frames, so rotate enough buffers
+            buffers = frames_in_flight(layout) if layout is not None else 2
+            cap = RawPipeCapture(args.pipe, width, height, buffers=buffers)
+        classifier = None
+        if args.classifier:
+            from classifier import CentroidClassifier
+            classifier = CentroidClassifier.load(args.classifier)
+        duty = None
+        if args.duty_cycle:
+            from duty_cycle import DutyCycler
+            duty = DutyCycler(use_fps=cap is None)
+        gate = ChangeGate() if args.change_gate else None
+        detector = TrafficLightDetector(cap, timeline=EventTimeline(args.timeline),
+                                        classifier=classifier, gate=gate, duty=duty)
+        if args.clips:
+            from clip_recorder import PreEventRecorder
+            # Built once the detector has opened its source, so its rate is known
+            fps = detector.cap.get(cv2.CAP_PROP_FPS)
+            detector.recorder = PreEventRecorder(args.clips, fps=fps or 30.0)
+        if args.pipeline:
+            detector.run_pipeline(layout)
+        else:
+            detector.run()
     except Exception as e:
         print(f"Application error: {e}")
 
@@ -0,0 +1,6 @@
+#shared traffic light colour codes
+
+# Compact integer codes so per-frame results fit in numpy columns
+NONE, RED, YELLOW, GREEN = 0, 1, 2, 3
+COLOR_NAMES = ("NONE", "RED", "YELLOW", "GREEN")
+COLOR_CODES = {name: code for code, name in enumerate(COLOR_NAMES)}
@@ -0,0 +1,151 @@
+#scene-aware duty cycling of the capture rate
+#
+# While no saturated red/yellow/green candidate is in view the loop only
+# processes every Nth frame (or asks the camera for a lower CAP_PROP_FPS
+# when the driver honours it). The first processed frame that shows a
+# candidate, or that the detector classifies as a colour, switches straight
+# back to full rate. The probe uses the same hue and saturation/value
+# windows as the detector, including a calibrated profile, and counts lit
+# pixels at frame scale so a lamp of a given size counts at any resolution.
+
+import time
+
+import cv2
+import numpy as np
+
+from batch import DEFAULT_THRESHOLDS
+
+ACTIVE = "ACTIVE"
+IDLE = "IDLE"
+
+
+class DutyCycler:
+    """Drop the processing rate when no light candidate is visible"""
+
+    def __init__(self, idle_every=6, hold=2.0, min_pixels=100, probe_step=4,
+                 use_fps=False, full_fps=30.0, thresholds=None):
+        self.idle_every = idle_every  # process 1 of N frames when idle
+        self.hold = hold  # seconds to stay active after the last candidate
+        self.min_pixels = min_pixels  # lit frame pixels that make a candidate
+        self.probe_step = probe_step  # probe samples every Nth pixel in x and y
+        self.use_fps = use_fps
+        self.full_fps = full_fps
+        self.set_thresholds(DEFAULT_THRESHOLDS if thresholds is None else thresholds)
+
+        self.mode = ACTIVE
+        self.last_candidate_time = time.time()
+        self.fps_lowered = False
+
+        # Probe buffers, reallocated only when the frame size changes
+        self.small = self.hsv = self.mask = self.band = None
+
+        # CPU accounting per mode
+        self.cpu = {ACTIVE: 0.0, IDLE: 0.0}
+        self.wall = {ACTIVE: 0.0, IDLE: 0.0}
+        self.processed = {ACTIVE: 0, IDLE: 0}
+        self.grabbed = 0
+        self._cpu_mark = time.process_time()
+        self._wall_mark = time.perf_counter()
+
+    def read(self, cap):
+        """cap.read() that skips decoding of decimated frames while idle"""
+        if self.mode == IDLE and not self.fps_lowered:
+            grab = getattr(cap, "grab", None)
+            for _ in range(self.idle_every - 1):
+                if grab is not None:
+                    if not grab():
+                        break
+                else:
+                    cap.read()
+                self.grabbed += 1
+        return cap.read()
+
+    def set_thresholds(self, thresholds):
+        """Build the probe's inRange bounds from detector thresholds (batch.py format)"""
+        # Hue is an integer, so "< x" is "<= x - 1" and "> x" is ">= x + 1"
+        hues = [(0, thresholds["red_below"] - 1),
+                (thresholds["red_above"] + 1, 180),
+                (thresholds["yellow"][0], thresholds["yellow"][1] - 1),
+                (thresholds["green"][0], thresholds["green"][1] - 1)]
+        sat = int(thresholds["sat_min"])
+        val = int(thresholds["val_min"])
+        self.windows = [((int(lo), sat, val), (int(hi), 255, 255)) for lo, hi in hues if hi >= lo]
+
+    def has_candidate(self, frame):
+        """Cheap probe for a bright saturated red, yellow or green blob"""
+        h, w = frame.shape[:2]
+        size = (max(w // self.probe_step, 1), max(h // self.probe_step, 1))
+        if self.small is None or self.small.shape[1::-1] != size:
+            self.small = np.zeros((size[1], size[0], 3), np.uint8)
+            self.hsv = np.zeros_like(self.small)
+            self.mask = np.zeros(self.small.shape[:2], np.uint8)
+            self.band = np.zeros_like(self.mask)
+        cv2.resize(frame, size, dst=self.small, interpolation=cv2.INTER_NEAREST)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2HSV, dst=self.hsv)
+        self.mask[:] = 0
+        for lower, upper in self.windows:
+            cv2.inRange(self.hsv, lower, upper, dst=self.band)
+            cv2.bitwise_or(self.mask, self.band, dst=self.mask)
+        # Each probe pixel stands for probe_step^2 frame pixels
+        lit = cv2.countNonZero(self.mask) * self.probe_step * self.probe_step
+        return lit >= self.min_pixels
+
+    def update(self, frame, cap=None, color="NONE"):
+        """Account CPU for the frame just handled and pick the next mode
+
+        color is the detector's latest result; a recognised light always
+        counts as a candidate, whatever the probe sees.
+        """
+        now = time.time()
+        self._account()
+        if color != "NONE" or self.has_candidate(frame):
+            self.last_candidate_time = now
+            if self.mode == IDLE:
+                print("🚥 Light candidate in view - full frame rate")
+                self._set_mode(ACTIVE, cap)
+        elif self.mode == ACTIVE and now - self.last_candidate_time > self.hold:
+            print("💤 No light candidate - reducing frame rate")
+            self._set_mode(IDLE, cap)
+        return self.mode
+
+    def _set_mode(self, mode, cap):
+        self.mode = mode
+        if not self.use_fps or cap is None:
+            return
+        if mode == IDLE:
+            target = self.full_fps / self.idle_every
+            # Fall back to decimation if the driver ignores the request
+            self.fps_lowered = bool(cap.set(cv2.CAP_PROP_FPS, target)) and \
+                abs(cap.get(cv2.CAP_PROP_FPS) - target) < 1
+        else:
+            if self.fps_lowered:
+                cap.set(cv2.CAP_PROP_FPS, self.full_fps)
+            self.fps_lowered = False
+
+    def _account(self):
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        self.cpu[self.mode] += cpu - self._cpu_mark
+        self.wall[self.mode] += wall - self._wall_mark
+        self.processed[self.mode] += 1
+        self._cpu_mark = cpu
+        self._wall_mark = wall
+
+    def report(self):
+        """CPU seconds per hour, duty cycled vs. an always-on estimate"""
+        wall = self.wall[ACTIVE] + self.wall[IDLE]
+        cpu = self.cpu[ACTIVE] + self.cpu[IDLE]
+        if wall <= 0:
+            return "⚡ No frames processed"
+        per_hour = cpu / wall * 3600
+        active_share = self.wall[ACTIVE] / wall
+
+        # Always-on would cost the active per-second rate for the whole run
+        if self.wall[ACTIVE] > 0:
+            always_on = self.cpu[ACTIVE] / self.wall[ACTIVE] * 3600
+            saving = f", always-on ~{always_on:.0f} s/h ({(1 - per_hour / always_on) * 100:.0f}% saved)" \
+                if always_on > 0 else ""
+        else:
+            saving = ""
+        return (f"⚡ CPU {per_hour:.0f} s/h{saving}; active {active_share * 100:.0f}% of the time, "
+                f"{self.grabbed} frames skipped while idle")
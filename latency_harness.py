@@ -0,0 +1,201 @@
+#light-change to announcement latency harness
+#
+#   python latency_harness.py --cycles 10 --fps 30 --camera-delay 40
+#
+# Plays a scripted sequence of colour switches at known times through the
+# real TrafficLightDetector.run() loop (headless) with a recording speech
+# engine, then reports how long each change took to be heard, split into:
+#
+#   capture   scripted change -> first frame showing it returned by read()
+#   detect    read() -> detect_color reported the new colour
+#   debounce  detection -> should_speak() accepted it
+#   tts       accepted -> engine.say() started (thread start, busy voice)
+
+import argparse
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from colors import COLOR_NAMES
+
+DEFAULT_SCRIPT = [("RED", 4.0), ("GREEN", 4.0), ("YELLOW", 2.0)]
+STEPS = ("capture", "detect", "debounce", "tts", "total")
+
+LAMP_HSV = {"RED": (0, 230, 230), "GREEN": (60, 230, 230), "YELLOW": (27, 230, 230)}
+
+
+class ScriptedCapture:
+    """Real-time frame source following a (color, seconds) script
+
+    Frame i is exposed at start + i / fps and handed out camera_delay
+    seconds later, like a camera with that much sensor-to-read latency.
+    """
+
+    def __init__(self, script, fps=30.0, camera_delay=0.0, width=640, height=360):
+        self.script = script
+        self.fps = fps
+        self.camera_delay = camera_delay
+        self.index = 0
+        self.start = None
+        self.changes = []  # [color, scripted time, first read time]
+
+        # Segment boundaries in seconds from the start
+        self.bounds = np.cumsum([seconds for _, seconds in script])
+        self.frames = {}
+        for name in {color for color, _ in script} | {"NONE"}:
+            frame = np.full((height, width, 3), 40, np.uint8)
+            if name in LAMP_HSV:
+                lamp = np.zeros((1, 1, 3), np.uint8)
+                lamp[:] = LAMP_HSV[name]
+                bgr = cv2.cvtColor(lamp, cv2.COLOR_HSV2BGR)[0, 0]
+                cv2.circle(frame, (width // 2, height // 2), 40, tuple(int(c) for c in bgr), -1)
+            self.frames[name] = frame
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.start is None:
+            self.start = time.time()
+        exposed = self.index / self.fps
+        segment = int(np.searchsorted(self.bounds, exposed, "right"))
+        if segment >= len(self.script):
+            return False, None
+
+        delay = self.start + exposed + self.camera_delay - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        color = self.script[segment][0]
+        if not self.changes or self.changes[-1][0] != color:
+            change_time = self.start + (self.bounds[segment - 1] if segment else 0.0)
+            self.changes.append([color, change_time, time.time()])
+        self.index += 1
+        # A fresh copy, as a real camera would hand out
+        return True, self.frames[color].copy()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+
+class RecordingEngine:
+    """Speech backend that logs when each utterance starts"""
+
+    def __init__(self, duration=0.8):
+        self.duration = duration  # seconds one utterance keeps the voice busy
+        self.spoken = []  # (start time, text)
+        self.lock = threading.Lock()
+
+    def say(self, text):
+        with self.lock:
+            self.spoken.append((time.time(), text))
+        time.sleep(self.duration)
+
+    def runAndWait(self):
+        pass
+
+    def setProperty(self, *args):
+        pass
+
+
+def instrument(detector):
+    """Record when should_speak() accepts each colour"""
+    accepted = []
+    should_speak = detector.should_speak
+
+    def wrapped(color):
+        result = should_speak(color)
+        if result:
+            # A busy voice delays the request; that wait counts as tts
+            accepted.append((time.time(), color))
+        return result
+
+    detector.should_speak = wrapped
+    return accepted
+
+
+def _first_after(events, t, color):
+    for stamp, name in events:
+        if stamp >= t and name == color:
+            return stamp
+    return None
+
+
+def measure(cap, engine, detector, accepted):
+    """Per-change latency split into steps -> {step: array of seconds}"""
+    timeline = detector.timeline
+    detected = list(zip(timeline.tr_t[:timeline.tr_count].tolist(),
+                        [COLOR_NAMES[c] for c in timeline.tr_to[:timeline.tr_count]]))
+    results = {step: [] for step in STEPS}
+    missed = 0
+    previous = None
+    for color, changed, captured in cap.changes:
+        if color == "NONE" or color == previous:
+            continue
+        previous = color
+        t_detect = _first_after(detected, captured, color)
+        t_accept = _first_after(accepted, captured, color)
+        t_speech = _first_after(engine.spoken, captured, color)
+        if None in (t_detect, t_accept, t_speech):
+            missed += 1
+            continue
+        results["capture"].append(captured - changed)
+        results["detect"].append(t_detect - captured)
+        results["debounce"].append(t_accept - t_detect)
+        results["tts"].append(t_speech - t_accept)
+        results["total"].append(t_speech - changed)
+    return {step: np.array(values) for step, values in results.items()}, missed
+
+
+def report(results, missed):
+    lines = [f"⏱️  {len(results['total'])} changes measured, {missed} never announced",
+             f"   {'step':<9}{'mean':>8}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}  (ms)"]
+    for step in STEPS:
+        values = results[step] * 1000
+        if not len(values):
+            continue
+        p50, p90, p99 = np.percentile(values, (50, 90, 99))
+        lines.append(f"   {step:<9}{values.mean():8.1f}{p50:8.1f}{p90:8.1f}{p99:8.1f}{values.max():8.1f}")
+    return "\n".join(lines)
+
+
+def run_harness(script, fps=30.0, camera_delay=0.0, speech_duration=0.8, **detector_args):
+    from code2 import TrafficLightDetector
+
+    cap = ScriptedCapture(script, fps, camera_delay)
+    engine = RecordingEngine(speech_duration)
+    detector = TrafficLightDetector(cap, engine=engine, show=False, **detector_args)
+    accepted = instrument(detector)
+    detector.run()
+    # Let a speech thread that is still starting finish logging
+    time.sleep(0.05)
+    return measure(cap, engine, detector, accepted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure light-change to speech latency")
+    parser.add_argument("--cycles", type=int, default=5, help="repetitions of RED/GREEN/YELLOW")
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--camera-delay", type=float, default=0.0, help="ms from exposure to read()")
+    parser.add_argument("--speech-duration", type=float, default=0.8, help="seconds per utterance")
+    args = parser.parse_args()
+
+    script = [("NONE", 1.0)] + DEFAULT_SCRIPT * args.cycles
+    total = sum(seconds for _, seconds in script)
+    print(f"🚦 Playing {len(script) - 1} scripted changes over {total:.0f}s")
+    results, missed = run_harness(script, args.fps, args.camera_delay / 1000,
+                                  args.speech_duration)
+    print(report(results, missed))
+
+
+if __name__ == "__main__":
+    main()
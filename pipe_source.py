@@ -0,0 +1,101 @@
+#raw BGR frames from stdin or a named pipe
+#
+#   ffmpeg -i drive.mp4 -f rawvideo -pix_fmt bgr24 - | python code2.py --pipe - --size 640x360
+#   gst-launch-1.0 ... ! video/x-raw,format=BGR ! fdsink | python code2.py --pipe - --size 1280x720
+#
+# Frames are read with readinto() straight into preallocated numpy buffers,
+# so there is no allocation per frame.
+
+import sys
+
+import cv2
+import numpy as np
+
+
+class RawPipeCapture:
+    """cv2.VideoCapture-like source reading fixed-size raw BGR frames
+
+    read() hands out one of `buffers` reused arrays in rotation. A frame
+    stays valid until `buffers` more frames have been read, so use at least
+    pipeline.frames_in_flight(layout) when stages run on worker threads.
+    """
+
+    def __init__(self, path="-", width=640, height=480, fps=30.0, buffers=2):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_bytes = width * height * 3
+        if path == "-":
+            self.stream = sys.stdin.buffer
+            self._owns_stream = False
+        else:
+            # Unbuffered: readinto goes straight from the pipe into our array
+            self.stream = open(path, "rb", buffering=0)
+            self._owns_stream = True
+
+        self.buffers = [np.empty((height, width, 3), np.uint8) for _ in range(max(buffers, 1))]
+        self.views = [memoryview(buf.reshape(-1)) for buf in self.buffers]
+        self.next_buffer = 0
+        self.frames = 0
+        self.opened = True
+
+    def isOpened(self):
+        return self.opened
+
+    def _fill(self, view):
+        """Read exactly one frame into view; pipes may return short reads"""
+        filled = 0
+        while filled < self.frame_bytes:
+            n = self.stream.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        return True
+
+    def read(self):
+        """Return (ret, frame) like cv2.VideoCapture.read"""
+        if not self.opened:
+            return False, None
+        index = self.next_buffer
+        if not self._fill(self.views[index]):
+            self.opened = False
+            return False, None
+        self.next_buffer = (index + 1) % len(self.buffers)
+        self.frames += 1
+        return True, self.buffers[index]
+
+    def grab(self):
+        """Consume one frame without handing it out"""
+        if not self.opened:
+            return False
+        if not self._fill(self.views[self.next_buffer]):
+            self.opened = False
+            return False
+        self.frames += 1
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames)
+        return 0.0
+
+    def set(self, prop, value):
+        # Size and rate are decided by the upstream decoder
+        return False
+
+    def release(self):
+        if self._owns_stream and not self.stream.closed:
+            self.stream.close()
+        self.opened = False
+
+
+def parse_size(text):
+    """Parse "640x360" into (640, 360)"""
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
@@ -0,0 +1,298 @@
+#configurable stage-graph pipeline for the traffic light detector
+#
+#   python code2.py --pipeline layout.json [recording.raw]
+#
+# layout.json lists the stages in order and the thread each one runs on.
+# Consecutive stages on the same thread form one segment; "caller" runs in
+# the main thread (needed for imshow), any other name gets a worker thread
+# fed by a bounded queue:
+#
+#   {"stages": [
+#       {"name": "capture",    "thread": "caller"},
+#       {"name": "preprocess", "thread": "detect", "queue": 4},
+#       {"name": "classify",   "thread": "detect"},
+#       {"name": "debounce",   "thread": "caller", "queue": 4},
+#       {"name": "announce",   "thread": "caller"},
+#       {"name": "render",     "thread": "caller"},
+#       {"name": "sink",       "thread": "caller"}]}
+
+import json
+import queue
+import threading
+import time
+
+import cv2
+
+STAGE_ORDER = ("capture", "preprocess", "classify", "debounce", "announce", "render", "sink")
+CALLER = "caller"
+
+DEFAULT_LAYOUT = {"stages": [{"name": name, "thread": CALLER} for name in STAGE_ORDER]}
+
+_END = object()  # end-of-stream marker passed down the queues
+
+
+class FrameContext:
+    """Everything one frame carries from stage to stage"""
+
+    __slots__ = ("index", "t_capture", "raw", "frame", "changed", "cx", "cy",
+                 "color", "confidence", "speak")
+
+    def __init__(self, index, frame):
+        self.index = index
+        self.t_capture = time.time()
+        self.raw = frame  # as captured; frame becomes the mirrored, drawn copy
+        self.frame = frame
+        self.changed = True
+        self.cx = self.cy = 0
+        self.color = "NONE"
+        self.confidence = 0.0
+        self.speak = False
+
+
+def detector_stages(detector, window="Traffic Light Detector - PIPELINE"):
+    """Stage callables bound to a TrafficLightDetector
+
+    Each takes a FrameContext and returns it, or None to end the stream.
+    """
+    state = {"index": 0, "color": "NONE", "confidence": 0.0}
+
+    def capture(_):
+        if detector.duty is not None:
+            ret, frame = detector.duty.read(detector.cap)
+        else:
+            ret, frame = detector.cap.read()
+        if not ret:
+            print("Failed to grab frame")
+            return None
+        if detector.duty is not None:
+            # Mode changes call cap.set(), so they stay on the thread that reads;
+            # the colour is the latest classified one, maybe a frame behind
+            detector.duty.update(frame, detector.cap, state["color"])
+        state["index"] += 1
+        return FrameContext(state["index"], frame)
+
+    def preprocess(ctx):
+        # Flip frame horizontally for mirror effect
+        ctx.frame = cv2.flip(ctx.frame, 1)
+        ctx.changed = detector.gate is None or detector.gate.changed(ctx.frame)
+        h, w = ctx.frame.shape[:2]
+        ctx.cx, ctx.cy = w // 2, h // 2
+        return ctx
+
+    def classify(ctx):
+        start = time.perf_counter()
+        if ctx.changed:
+            state["color"] = detector.detect_color(ctx.frame)
+            state["confidence"] = detector.current_confidence
+        ctx.color, ctx.confidence = state["color"], state["confidence"]
+        detector.timeline.record(ctx.t_capture, ctx.color, ctx.confidence,
+                                 latency=time.perf_counter() - start)
+        if detector.recorder is not None:
+            detector.recorder.update(ctx.raw, ctx.color, ctx.t_capture)
+        return ctx
+
+    def debounce(ctx):
+        detector.current_display_color = ctx.color
+        ctx.speak = detector.should_speak(ctx.color) and not detector.speaking
+        return ctx
+
+    def announce(ctx):
+        if ctx.speak:
+            print(f"🗣️  Requesting speech: '{ctx.color}'")
+            speech_thread = threading.Thread(target=detector.speak_color_threaded,
+                                             args=(ctx.color,))
+            speech_thread.daemon = True
+            speech_thread.start()
+        return ctx
+
+    def render(ctx):
+        if detector.show:
+            detector.draw_interface(ctx.frame, ctx.color, ctx.cx, ctx.cy)
+        return ctx
+
+    def sink(ctx):
+        if not detector.show:
+            return ctx
+        cv2.imshow(window, ctx.frame)
+        if cv2.waitKey(1) & 0xFF == 27:  # ESC key
+            return None
+        return ctx
+
+    return {
+        "capture": capture,
+        "preprocess": preprocess,
+        "classify": classify,
+        "debounce": debounce,
+        "announce": announce,
+        "render": render,
+        "sink": sink,
+    }
+
+
+class _Segment:
+    """Consecutive stages sharing one thread"""
+
+    def __init__(self, thread, queue_size):
+        self.thread = thread
+        self.names = []
+        self.funcs = []
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.worker = None
+
+    def process(self, ctx, timings):
+        for name, func in zip(self.names, self.funcs):
+            start = time.perf_counter()
+            ctx = func(ctx)
+            timings[name] += time.perf_counter() - start
+            if ctx is None:
+                return None
+        return ctx
+
+
+class Pipeline:
+    """Run stages in the configured order and thread layout"""
+
+    def __init__(self, stages, layout=None):
+        layout = DEFAULT_LAYOUT if layout is None else layout
+        specs = layout["stages"]
+        names = [spec["name"] for spec in specs]
+        unknown = [name for name in names if name not in stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s) in layout: {', '.join(unknown)}")
+        if not names or names[0] != "capture":
+            raise ValueError("Layout must start with the capture stage")
+        if specs[0].get("thread", CALLER) != CALLER:
+            raise ValueError("The capture stage must run on the caller thread")
+
+        self.segments = []
+        for spec in specs:
+            thread = spec.get("thread", CALLER)
+            if not self.segments or self.segments[-1].thread != thread:
+                self.segments.append(_Segment(thread, spec.get("queue", 4)))
+            self.segments[-1].names.append(spec["name"])
+            self.segments[-1].funcs.append(stages[spec["name"]])
+
+        self.timings = {name: 0.0 for name in names}
+        self.frames_in = 0
+        self.frames_out = 0
+        self.stopped = threading.Event()
+        self.elapsed = 0.0
+
+    def _emit(self, position, ctx):
+        """Hand ctx to the segment after position (None -> end of stream)"""
+        if position + 1 >= len(self.segments):
+            if ctx is not None:
+                self.frames_out += 1
+            else:
+                self.stopped.set()
+            return
+        nxt = self.segments[position + 1]
+        item = _END if ctx is None else ctx
+        if self.segments[position].thread != CALLER:
+            nxt.inbox.put(item)
+            return
+        # Blocking put for backpressure; the caller keeps draining meanwhile
+        # so a full queue further down cannot deadlock it
+        while True:
+            try:
+                nxt.inbox.put(item, timeout=0.005)
+                return
+            except queue.Full:
+                if self.stopped.is_set():
+                    return
+                self._drain(block=False)
+
+    def _worker(self, position):
+        segment = self.segments[position]
+        while True:
+            item = segment.inbox.get()
+            if item is _END:
+                self._emit(position, None)
+                return
+            try:
+                ctx = segment.process(item, self.timings)
+            except Exception as e:
+                print(f"Stage error in {'+'.join(segment.names)}: {e}")
+                ctx = None
+            self._emit(position, ctx)
+            if ctx is None:
+                return
+
+    def _drain(self, block):
+        """Run queued items through the caller segments after the first"""
+        for position, segment in enumerate(self.segments):
+            if position == 0 or segment.thread != CALLER:
+                continue
+            while True:
+                try:
+                    item = segment.inbox.get(timeout=0.05) if block else segment.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    self._emit(position, None)
+                    break
+                self._emit(position, segment.process(item, self.timings))
+
+    def run(self):
+        """Pump frames until the source ends or a stage returns None"""
+        for position, segment in enumerate(self.segments):
+            if segment.thread != CALLER:
+                segment.worker = threading.Thread(target=self._worker, args=(position,),
+                                                  name=f"stage-{segment.thread}", daemon=True)
+                segment.worker.start()
+
+        start = time.perf_counter()
+        first = self.segments[0]
+        try:
+            while not self.stopped.is_set():
+                ctx = first.process(None, self.timings)
+                if ctx is not None:
+                    self.frames_in += 1
+                self._emit(0, ctx)
+                if ctx is None:
+                    break
+                self._drain(block=False)
+            # Let the workers flush what is still queued
+            drains = any(position and segment.thread == CALLER
+                         for position, segment in enumerate(self.segments))
+            while not self.stopped.is_set():
+                if drains:
+                    self._drain(block=True)
+                else:
+                    # Workers run to the end; just wait for the last one
+                    self.stopped.wait(0.05)
+        except KeyboardInterrupt:
+            print("\nExiting...")
+        self.elapsed = time.perf_counter() - start
+        return self.report()
+
+    def report(self):
+        """Throughput plus time spent in each stage"""
+        elapsed = max(self.elapsed, 1e-9)
+        lines = [f"🏁 {self.frames_out} frames in {elapsed:.2f}s = "
+                 f"{self.frames_out / elapsed:.1f} fps "
+                 f"({' | '.join('+'.join(s.names) + '@' + s.thread for s in self.segments)})"]
+        for name, seconds in self.timings.items():
+            per_frame = seconds / max(self.frames_in, 1) * 1000
+            lines.append(f"   {name:<10} {per_frame:7.2f} ms/frame")
+        return "\n".join(lines)
+
+
+def frames_in_flight(layout=None):
+    """Most frames a layout can hold at once: every queue full, one per worker, plus 2"""
+    specs = (DEFAULT_LAYOUT if layout is None else layout)["stages"]
+    queued, workers, thread = 0, 0, None
+    for position, spec in enumerate(specs):
+        if spec.get("thread", CALLER) == thread:
+            continue
+        thread = spec.get("thread", CALLER)
+        # The first segment reads the source directly and has no queue
+        if position:
+            queued += spec.get("queue", 4)
+        workers += thread != CALLER
+    return queued + workers + 2
+
+
+def load_layout(path):
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,257 @@
+#raw frame recording and decode-free replay
+#
+# record:  python replay.py record session.raw --camera 0 --frames 900
+# replay:  python replay.py bench session.raw [--realtime]
+#
+# File layout: a 64 byte header followed by fixed-stride records of
+# (float64 timestamp, height x width x 3 uint8 BGR frame), so any frame
+# is reachable by offset and replay is a plain np.memmap view.
+
+import argparse
+import os
+import struct
+import time
+
+import cv2
+import numpy as np
+
+MAGIC = b"CDRAW001"
+HEADER_FORMAT = "<8sIIIIQd"  # magic, width, height, channels, reserved, count, fps
+HEADER_SIZE = 64
+
+
+def record_dtype(width, height, channels=3):
+    """Numpy dtype of one on-disk record"""
+    return np.dtype([("t", "<f8"), ("frame", np.uint8, (height, width, channels))])
+
+
+def _write_header(fh, width, height, channels, count, fps):
+    header = struct.pack(HEADER_FORMAT, MAGIC, width, height, channels, 0, count, fps)
+    fh.seek(0)
+    fh.write(header.ljust(HEADER_SIZE, b"\0"))
+
+
+def read_header(path):
+    """Return (width, height, channels, count, fps) of a recording"""
+    with open(path, "rb") as fh:
+        raw = fh.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path}: file too short for a raw recording")
+    magic, width, height, channels, _, count, fps = struct.unpack_from(HEADER_FORMAT, raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a raw frame recording")
+    return width, height, channels, count, fps
+
+
+class RawFrameRecorder:
+    """Dump frames from cap.read() into a memory-mapped fixed-stride file"""
+
+    def __init__(self, path, width, height, max_frames, fps=30.0, channels=3):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.max_frames = max_frames
+        self.fps = fps
+        self.count = 0
+
+        # Preallocate the whole file so writes are plain memory copies
+        self.dtype = record_dtype(width, height, channels)
+        with open(path, "wb") as fh:
+            _write_header(fh, width, height, channels, 0, fps)
+            fh.truncate(HEADER_SIZE + self.dtype.itemsize * max_frames)
+        self.records = np.memmap(path, dtype=self.dtype, mode="r+",
+                                 offset=HEADER_SIZE, shape=(max_frames,))
+
+    def write(self, frame, timestamp=None):
+        """Append one frame; returns False once the file is full"""
+        if self.count >= self.max_frames:
+            return False
+        if frame.shape != (self.height, self.width, self.channels):
+            raise ValueError(f"Frame shape {frame.shape} does not match recording "
+                             f"{(self.height, self.width, self.channels)}")
+        self.records["t"][self.count] = time.time() if timestamp is None else timestamp
+        self.records["frame"][self.count] = frame
+        self.count += 1
+        return True
+
+    def close(self):
+        """Flush, record the final frame count and trim unused space"""
+        if self.records is None:
+            return
+        self.records.flush()
+        del self.records
+        self.records = None
+        with open(self.path, "r+b") as fh:
+            _write_header(fh, self.width, self.height, self.channels, self.count, self.fps)
+            fh.truncate(HEADER_SIZE + self.dtype.itemsize * self.count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayCapture:
+    """Drop-in stand-in for cv2.VideoCapture that replays a raw recording
+
+    read() returns zero-copy, read-only np.memmap views into the file.
+    With realtime=True frames are paced by their recorded timestamps,
+    otherwise they are returned as fast as the caller asks for them.
+    """
+
+    def __init__(self, path, realtime=False, loop=False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.width, self.height, self.channels, self.count, self.fps = read_header(path)
+        self.dtype = record_dtype(self.width, self.height, self.channels)
+        if self.count:
+            self.records = np.memmap(path, dtype=self.dtype, mode="r",
+                                     offset=HEADER_SIZE, shape=(self.count,))
+            self.timestamps = self.records["t"]
+            self.frames = self.records["frame"]
+        else:
+            self.records = None
+        self.position = 0
+        self._start_wall = None
+        self._start_stamp = None
+
+    def isOpened(self):
+        return self.records is not None
+
+    def read(self):
+        """Return (ret, frame) like cv2.VideoCapture.read"""
+        if self.records is None:
+            return False, None
+        if self.position >= self.count:
+            if not self.loop:
+                return False, None
+            self.position = 0
+            self._start_wall = None
+
+        if self.realtime:
+            stamp = float(self.timestamps[self.position])
+            if self._start_wall is None:
+                self._start_wall = time.perf_counter()
+                self._start_stamp = stamp
+            delay = (stamp - self._start_stamp) - (time.perf_counter() - self._start_wall)
+            if delay > 0:
+                time.sleep(delay)
+
+        frame = self.frames[self.position]
+        self.position += 1
+        return True, frame
+
+    def grab(self):
+        """Skip one frame without touching its pixels"""
+        if self.records is None or (self.position >= self.count and not self.loop):
+            return False
+        ret, _ = self.read()
+        return ret
+
+    def timestamp(self):
+        """Recorded timestamp of the frame last returned by read()"""
+        return float(self.timestamps[max(self.position - 1, 0)])
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.count)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES and 0 <= value < self.count:
+            self.position = int(value)
+            self._start_wall = None
+            return True
+        # Resolution and rate are fixed by the recording
+        return False
+
+    def release(self):
+        self.records = None
+        self.frames = None
+        self.timestamps = None
+
+
+def record(path, camera=0, frames=900, width=640, height=480):
+    """Record frames from a camera until the file is full or ESC is pressed"""
+    cap = cv2.VideoCapture(camera)
+    if not cap.isOpened():
+        raise Exception("Could not open camera")
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    ret, frame = cap.read()
+    if not ret:
+        cap.release()
+        raise Exception("Cannot read from camera")
+    h, w = frame.shape[:2]
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    print(f"⏺️  Recording {frames} frames of {w}x{h} to {path}")
+    with RawFrameRecorder(path, w, h, frames, fps=fps) as recorder:
+        while ret and recorder.write(frame):
+            cv2.imshow("Recording - ESC to stop", frame)
+            if cv2.waitKey(1) & 0xFF == 27:
+                break
+            ret, frame = cap.read()
+    cap.release()
+    cv2.destroyAllWindows()
+    print(f"✅ Recorded {recorder.count} frames")
+
+
+def bench(path, realtime=False):
+    """Replay a recording as fast as possible and report throughput"""
+    cap = ReplayCapture(path, realtime=realtime)
+    frames = 0
+    checksum = 0
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        # Touch one byte per row so the pages are really read
+        checksum += int(frame[:, 0, 0].sum())
+        frames += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"📼 {frames} frames in {elapsed:.3f}s "
+          f"({frames / max(elapsed, 1e-9):.0f} fps, {size_mb / max(elapsed, 1e-9):.0f} MB/s)")
+    return frames, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw frame recording and replay")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="record camera frames to a raw file")
+    rec.add_argument("path")
+    rec.add_argument("--camera", type=int, default=0)
+    rec.add_argument("--frames", type=int, default=900)
+    rec.add_argument("--width", type=int, default=640)
+    rec.add_argument("--height", type=int, default=480)
+
+    rep = sub.add_parser("bench", help="replay a raw file and report throughput")
+    rep.add_argument("path")
+    rep.add_argument("--realtime", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.path, args.camera, args.frames, args.width, args.height)
+    else:
+        bench(args.path, args.realtime)
+
+
+if __name__ == "__main__":
+    main()
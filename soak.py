@@ -0,0 +1,249 @@
+#long-run soak test for the detector
+#
+#   python soak.py --hours 8                          (synthetic source)
+#   python soak.py --hours 8 --recording drive.raw    (replayed in a loop)
+#
+# Runs the real TrafficLightDetector stages headless and samples RSS, Python
+# object count, thread count, open file descriptors and frame-time
+# percentiles every --interval seconds. After the run a straight line is
+# fitted to every metric and the soak fails if any grows faster than its
+# configured slope (per hour).
+
+import argparse
+import csv
+import gc
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from pipeline import STAGE_ORDER, Pipeline, detector_stages
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+METRICS = ("rss_mb", "objects", "threads", "fds", "p50_ms", "p95_ms", "p99_ms")
+
+
+class SyntheticCapture:
+    """Endless frames with a lit lamp cycling RED -> GREEN -> YELLOW in the centre"""
+
+    HSV = {"RED": (0, 230, 230), "GREEN": (60, 230, 230), "YELLOW": (27, 230, 230)}
+
+    def __init__(self, width=640, height=360, fps=30.0, seconds_per_color=4.0, noise=6,
+                 realtime=False):
+        self.fps = fps
+        self.realtime = realtime
+        self.start = None
+        self.frames_per_color = max(int(seconds_per_color * fps), 1)
+        self.index = 0
+        rng = np.random.default_rng(0)
+        # Prebuilt frames: a few noisy variants per colour, reused forever
+        self.frames = {}
+        for name in ("RED", "GREEN", "YELLOW", "NONE"):
+            variants = []
+            for _ in range(4):
+                frame = rng.integers(40, 40 + noise + 1, (height, width, 3), dtype=np.uint8)
+                if name in self.HSV:
+                    lamp = np.zeros((1, 1, 3), np.uint8)
+                    lamp[:] = self.HSV[name]
+                    bgr = cv2.cvtColor(lamp, cv2.COLOR_HSV2BGR)[0, 0]
+                    cv2.circle(frame, (width // 2, height // 2), 30, tuple(int(c) for c in bgr), -1)
+                variants.append(frame)
+            self.frames[name] = variants
+        self.cycle = ("RED", "NONE", "GREEN", "YELLOW")
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.realtime:
+            if self.start is None:
+                self.start = time.perf_counter()
+            delay = self.index / self.fps - (time.perf_counter() - self.start)
+            if delay > 0:
+                time.sleep(delay)
+        name = self.cycle[(self.index // self.frames_per_color) % len(self.cycle)]
+        frame = self.frames[name][self.index % 4]
+        self.index += 1
+        return True, frame
+
+    def grab(self):
+        self.index += 1
+        return True
+
+    def get(self, prop):
+        return 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+
+class _SilentEngine:
+    """pyttsx3 stand-in so a soak does not talk for hours"""
+
+    def say(self, text):
+        time.sleep(0.3)  # roughly the time a short phrase takes
+
+    def runAndWait(self):
+        pass
+
+    def setProperty(self, *args):
+        pass
+
+
+def rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        return float("nan")
+
+
+def open_fds():
+    if psutil is not None:
+        proc = psutil.Process()
+        return proc.num_handles() if hasattr(proc, "num_handles") else proc.num_fds()
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return float("nan")
+
+
+class SoakMonitor:
+    """Per-frame timing plus periodic process samples"""
+
+    def __init__(self, interval=60.0, window=100000):
+        self.interval = interval
+        self.frame_times = np.zeros(window, np.float64)  # preallocated ring
+        self.count = 0
+        self.samples = []  # (elapsed seconds, metrics...) every interval
+        self.start = time.perf_counter()
+        self.last_frame = None
+        self.next_sample = self.start + interval
+
+    def frame(self):
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.frame_times[self.count % len(self.frame_times)] = now - self.last_frame
+            self.count += 1
+        self.last_frame = now
+        if now >= self.next_sample:
+            self.sample(now)
+            self.next_sample = now + self.interval
+
+    def sample(self, now):
+        n = min(self.count, len(self.frame_times))
+        times = self.frame_times[:n] * 1000 if n else np.zeros(1)
+        p50, p95, p99 = np.percentile(times, (50, 95, 99))
+        row = (now - self.start, rss_mb(), len(gc.get_objects()), threading.active_count(),
+               open_fds(), p50, p95, p99)
+        self.samples.append(row)
+        self.count = 0  # percentiles are per interval
+        print(f"🧪 {row[0] / 3600:6.2f}h  rss {row[1]:7.1f} MB  objects {row[2]:8d}  "
+              f"threads {row[3]:3d}  fds {row[4]:4}  frame p50/p95/p99 "
+              f"{p50:.1f}/{p95:.1f}/{p99:.1f} ms")
+
+    def slopes(self, warmup=0.0):
+        """Least-squares growth per hour of every metric after warmup"""
+        rows = np.array([row for row in self.samples if row[0] >= warmup], np.float64)
+        if len(rows) < 3:
+            return {}
+        hours = rows[:, 0] / 3600
+        return {name: float(np.polyfit(hours, rows[:, i + 1], 1)[0])
+                for i, name in enumerate(METRICS)}
+
+    def write_csv(self, path):
+        with open(path, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(("seconds",) + METRICS)
+            writer.writerows(self.samples)
+
+
+def run_soak(detector, hours, interval, speak=True):
+    """Drive the detector stages headless for the given time"""
+    monitor = SoakMonitor(interval)
+    deadline = time.perf_counter() + hours * 3600
+    stages = detector_stages(detector)
+
+    def sink(ctx):
+        monitor.frame()
+        if time.perf_counter() >= deadline:
+            return None
+        return ctx
+
+    stages["sink"] = sink
+    if not speak:
+        stages["announce"] = lambda ctx: ctx
+    layout = {"stages": [{"name": name, "thread": "caller"} for name in STAGE_ORDER]}
+    detector.last_speak_time = time.time() - detector.repeat_delay
+    Pipeline(stages, layout).run()
+    monitor.sample(time.perf_counter())
+    return monitor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-run soak test")
+    parser.add_argument("--hours", type=float, default=4.0)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between samples")
+    parser.add_argument("--warmup", type=float, default=300.0,
+                        help="seconds ignored when fitting slopes")
+    parser.add_argument("--recording", help="raw recording to replay in a loop")
+    parser.add_argument("--realtime", action="store_true",
+                        help="pace frames in real time instead of as fast as possible")
+    parser.add_argument("--voice", action="store_true", help="use the real TTS engine")
+    parser.add_argument("--no-speech", action="store_true", help="skip the announce stage")
+    parser.add_argument("--csv", default="soak.csv")
+    parser.add_argument("--max-rss-mb", type=float, default=10.0, help="MB per hour")
+    parser.add_argument("--max-objects", type=float, default=5000.0, help="objects per hour")
+    parser.add_argument("--max-threads", type=float, default=0.5, help="threads per hour")
+    parser.add_argument("--max-fds", type=float, default=0.5, help="descriptors per hour")
+    parser.add_argument("--max-p95-ms", type=float, default=1.0, help="ms per hour")
+    args = parser.parse_args()
+
+    from code2 import TrafficLightDetector
+
+    if args.recording:
+        from replay import ReplayCapture
+        cap = ReplayCapture(args.recording, realtime=args.realtime, loop=True)
+    else:
+        cap = SyntheticCapture(realtime=args.realtime)
+    detector = TrafficLightDetector(cap, engine=None if args.voice else _SilentEngine(),
+                                    show=False)
+
+    print(f"🧪 Soak test for {args.hours}h, sampling every {args.interval:.0f}s")
+    monitor = run_soak(detector, args.hours, args.interval, speak=not args.no_speech)
+    detector.cap.release()
+    detector.timeline.close()
+    print(detector.timeline.summary())
+    monitor.write_csv(args.csv)
+
+    limits = {"rss_mb": args.max_rss_mb, "objects": args.max_objects,
+              "threads": args.max_threads, "fds": args.max_fds, "p95_ms": args.max_p95_ms}
+    slopes = monitor.slopes(args.warmup)
+    if not slopes:
+        print("⚠️  Not enough samples after warmup to fit slopes")
+        sys.exit(2)
+
+    failed = False
+    for name, limit in limits.items():
+        slope = slopes[name]
+        ok = not slope > limit  # NaN (metric unavailable) passes
+        failed |= not ok
+        print(f"   {'✅' if ok else '❌'} {name:<8} {slope:+10.2f}/h (limit {limit:+.2f}/h)")
+    print(f"📄 Samples written to {args.csv}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#tile-parallel colour mask processing for high-resolution cameras
+#
+#   python tiles.py bench --width 1920 --height 1080 --threads 1,2,4,8
+#   python tiles.py camera --threads 4 --color yellow [recording.raw]
+#
+# The inRange + GaussianBlur + morphologyEx + findContours chain from
+# code.py / codered.py is run on overlapping tiles in a thread pool (OpenCV
+# releases the GIL). Each tile processes its core plus a margin wide enough
+# for the blur and opening kernels, so the stitched mask matches the
+# full-frame one; blobs cut by tile seams are merged afterwards (boxes match
+# the full-frame result, areas of merged blobs are approximate).
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# (lower, upper) HSV ranges ORed together, as in codered.py and code.py
+RED_RANGES = [((0, 120, 70), (10, 255, 255)), ((170, 120, 70), (180, 255, 255))]
+YELLOW_RANGES = [((15, 150, 20), (35, 255, 255))]
+RANGES = {"red": RED_RANGES, "yellow": YELLOW_RANGES}
+
+BLUR_SIZE = 5
+OPEN_SIZE = 5
+MIN_AREA = 500
+
+
+def process_region(bgr, ranges):
+    """The single-core chain on one region -> cleaned mask"""
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, ranges[0][0], ranges[0][1])
+    for lower, upper in ranges[1:]:
+        mask = cv2.bitwise_or(mask, cv2.inRange(hsv, lower, upper))
+    mask = cv2.GaussianBlur(mask, (BLUR_SIZE, BLUR_SIZE), 0)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((OPEN_SIZE, OPEN_SIZE), np.uint8))
+
+
+def find_blobs(mask, min_area=MIN_AREA, offset=(0, 0)):
+    """Contours of a mask as [x, y, w, h, area] boxes in frame coordinates"""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    blobs = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area >= min_area:
+            x, y, w, h = cv2.boundingRect(contour)
+            blobs.append([x + offset[0], y + offset[1], w, h, area])
+    return blobs
+
+
+def full_frame(frame, ranges=RED_RANGES, min_area=MIN_AREA):
+    """Reference: the whole chain on one core"""
+    mask = process_region(frame, ranges)
+    return mask, find_blobs(mask, min_area)
+
+
+def _edges_meet(a, b):
+    """8-connected overlap of two sets of seam coordinates"""
+    return any(c - 1 in b or c in b or c + 1 in b for c in a)
+
+
+def merge_blobs(pieces):
+    """Join blob pieces that continue across a tile seam
+
+    pieces is a list of (tile, [x, y, w, h, area], edges) where edges maps
+    "left"/"right"/"top"/"bottom" to the set of rows/columns the piece
+    occupies on that tile edge. Two pieces join only if their pixels meet
+    across the seam, so distinct blobs that merely sit close stay apart.
+    """
+    parent = list(range(len(pieces)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Contours run through pixel centres, so each cut loses about one pixel
+    # per seam row; add it back for every join
+    seam_area = []
+    for i, (tile_a, _, edges_a) in enumerate(pieces):
+        for j in range(i + 1, len(pieces)):
+            tile_b, _, edges_b = pieces[j]
+            joined = 0
+            for first, second, ea, eb in ((tile_a, tile_b, edges_a, edges_b),
+                                          (tile_b, tile_a, edges_b, edges_a)):
+                if first[2] == second[0] and first[1] < second[3] and second[1] < first[3] \
+                        and _edges_meet(ea["right"], eb["left"]):
+                    joined += (len(ea["right"]) + len(eb["left"])) / 2
+                if first[3] == second[1] and first[0] < second[2] and second[0] < first[2] \
+                        and _edges_meet(ea["bottom"], eb["top"]):
+                    joined += (len(ea["bottom"]) + len(eb["top"])) / 2
+            if joined:
+                parent[root(j)] = root(i)
+                seam_area.append((i, joined))
+
+    groups = {}
+    for i, (_, (x, y, w, h, area), _) in enumerate(pieces):
+        r = root(i)
+        if r not in groups:
+            groups[r] = [x, y, x + w, y + h, area]
+        else:
+            g = groups[r]
+            g[0], g[1] = min(g[0], x), min(g[1], y)
+            g[2], g[3] = max(g[2], x + w), max(g[3], y + h)
+            g[4] += area
+    for i, extra in seam_area:
+        groups[root(i)][4] += extra
+    return [[x0, y0, x1 - x0, y1 - y0, area] for x0, y0, x1, y1, area in groups.values()]
+
+
+class TileMasker:
+    """Split a frame into overlapping tiles and process them in parallel"""
+
+    def __init__(self, threads=4, grid=None, ranges=RED_RANGES, min_area=MIN_AREA,
+                 margin=None):
+        self.threads = threads
+        self.grid = grid  # (cols, rows); defaults to one row band per thread
+        self.ranges = ranges
+        self.min_area = min_area
+        # Blur radius + erode radius + dilate radius, plus one pixel of slack
+        self.margin = margin if margin is not None else BLUR_SIZE // 2 + 2 * (OPEN_SIZE // 2) + 1
+        self.pool = ThreadPoolExecutor(max_workers=threads) if threads > 1 else None
+        self.mask = None
+        self.tiles = None
+
+    def _layout(self, height, width):
+        cols, rows = self.grid or (1, self.threads)
+        tiles = []
+        for r in range(rows):
+            y0, y1 = height * r // rows, height * (r + 1) // rows
+            for c in range(cols):
+                x0, x1 = width * c // cols, width * (c + 1) // cols
+                tiles.append((x0, y0, x1, y1))
+        return tiles
+
+    def _tile(self, frame, tile):
+        x0, y0, x1, y1 = tile
+        h, w = frame.shape[:2]
+        m = self.margin
+        # Padded window, clipped at the frame border
+        px0, py0 = max(x0 - m, 0), max(y0 - m, 0)
+        px1, py1 = min(x1 + m, w), min(y1 + m, h)
+        padded = process_region(frame[py0:py1, px0:px1], self.ranges)
+        core = padded[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+        self.mask[y0:y1, x0:x1] = core
+
+        # Blobs clear of inner seams are final; seam pieces may be parts of a
+        # bigger blob, so they are kept whatever their size until merged.
+        # CHAIN_APPROX_NONE keeps every edge pixel for the seam test.
+        contours, _ = cv2.findContours(core, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        cw, ch = x1 - x0, y1 - y0
+        done, pieces = [], []
+        for contour in contours:
+            bx, by, bw, bh = cv2.boundingRect(contour)
+            blob = [bx + x0, by + y0, bw, bh, cv2.contourArea(contour)]
+            on_seam = (bx == 0 and x0 > 0) or (by == 0 and y0 > 0) or \
+                (bx + bw == cw and x1 < w) or (by + bh == ch and y1 < h)
+            if not on_seam:
+                if blob[4] >= self.min_area:
+                    done.append(blob)
+                continue
+            px, py = contour[:, 0, 0], contour[:, 0, 1]
+            edges = {
+                "left": set((py[px == 0] + y0).tolist()),
+                "right": set((py[px == cw - 1] + y0).tolist()),
+                "top": set((px[py == 0] + x0).tolist()),
+                "bottom": set((px[py == ch - 1] + x0).tolist()),
+            }
+            pieces.append((tile, blob, edges))
+        return done, pieces
+
+    def process(self, frame):
+        """-> (mask, blobs) equivalent to full_frame(frame)"""
+        h, w = frame.shape[:2]
+        if self.mask is None or self.mask.shape != (h, w):
+            self.mask = np.empty((h, w), np.uint8)
+            self.tiles = self._layout(h, w)
+        if self.pool is None:
+            per_tile = [self._tile(frame, tile) for tile in self.tiles]
+        else:
+            per_tile = list(self.pool.map(lambda tile: self._tile(frame, tile), self.tiles))
+        blobs = [blob for done, _ in per_tile for blob in done]
+        merged = merge_blobs([piece for _, pieces in per_tile for piece in pieces])
+        return self.mask, blobs + [blob for blob in merged if blob[4] >= self.min_area]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def synthetic_frame(width, height, blobs=40, seed=0):
+    """Noisy frame with red and yellow discs scattered over it"""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 50, (height, width, 3), dtype=np.uint8)
+    for _ in range(blobs):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(10, 60))
+        color = (0, 0, 230) if rng.random() < 0.7 else (0, 220, 230)
+        cv2.circle(frame, center, radius, color, -1)
+    return frame
+
+
+def bench(width, height, thread_counts, repeats=30):
+    """ms/frame of the tiled chain for each thread count"""
+    frame = synthetic_frame(width, height)
+    # Keep OpenCV from parallelising inside each call so scaling is ours
+    cv2.setNumThreads(1)
+    reference_mask, reference_blobs = full_frame(frame)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        full_frame(frame)
+    baseline = (time.perf_counter() - start) / repeats
+
+    print(f"🖼️  {width}x{height}, {len(reference_blobs)} blobs")
+    print(f"   full frame      {baseline * 1000:7.2f} ms/frame")
+    results = {}
+    for threads in thread_counts:
+        masker = TileMasker(threads)
+        mask, blobs = masker.process(frame)
+        same_mask = np.array_equal(mask, reference_mask)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            masker.process(frame)
+        elapsed = (time.perf_counter() - start) / repeats
+        masker.close()
+        results[threads] = elapsed
+        print(f"   {threads} thread(s)     {elapsed * 1000:7.2f} ms/frame  "
+              f"x{baseline / elapsed:4.2f}  blobs {len(blobs)}  "
+              f"mask {'identical' if same_mask else 'DIFFERS'}")
+    return baseline, results
+
+
+def camera(source=None, threads=4, grid=None, ranges=RED_RANGES, width=1920, height=1080):
+    """code.py's live loop with the tiled chain: boxes on the frame plus the mask"""
+    if source is None:
+        cap = cv2.VideoCapture(0)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    else:
+        from replay import ReplayCapture
+        cap = ReplayCapture(source, realtime=True)
+    if not cap.isOpened():
+        raise Exception("Could not open camera")
+
+    masker = TileMasker(threads, grid, ranges)
+    print(f"🧩 Tiled mask on {threads} thread(s), press ESC to exit")
+    try:
+        while True:
+            success, img = cap.read()
+            if not success:
+                break
+            if not img.flags.writeable:
+                img = img.copy()  # replayed frames are read-only memmap views
+            start = time.perf_counter()
+            mask, blobs = masker.process(img)
+            elapsed = time.perf_counter() - start
+
+            for x, y, w, h, _ in blobs:
+                cv2.rectangle(img, (x, y), (x + w, y + h), (0, 0, 255), 3)
+            cv2.putText(img, f"{elapsed * 1000:.1f} ms  {len(blobs)} blobs", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            cv2.imshow("mask", mask)
+            cv2.imshow("webcam", img)
+            if cv2.waitKey(1) & 0xFF == 27:  # ESC key
+                break
+    finally:
+        masker.close()
+        cap.release()
+        cv2.destroyAllWindows()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tile-parallel mask processing")
+    sub = parser.add_subparsers(dest="command", required=True)
+    timing = sub.add_parser("bench", help="measure scaling across thread counts")
+    timing.add_argument("--width", type=int, default=1920)
+    timing.add_argument("--height", type=int, default=1080)
+    timing.add_argument("--threads", default="1,2,4,8")
+    timing.add_argument("--repeats", type=int, default=30)
+    live = sub.add_parser("camera", help="run the tiled chain on live frames")
+    live.add_argument("recording", nargs="?", help="raw recording from replay.py instead of the camera")
+    live.add_argument("--threads", type=int, default=4)
+    live.add_argument("--grid", help="tile grid as COLSxROWS (default: one row band per thread)")
+    live.add_argument("--color", choices=sorted(RANGES), default="red")
+    live.add_argument("--width", type=int, default=1920)
+    live.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+    if args.command == "camera":
+        grid = tuple(int(n) for n in args.grid.lower().split("x")) if args.grid else None
+        camera(args.recording, args.threads, grid, RANGES[args.color], args.width, args.height)
+        return
+    bench(args.width, args.height, [int(t) for t in args.threads.split(",")], args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#columnar event timeline with a colour transition index
+#
+# Per-frame results go into preallocated numpy columns (no dict or object
+# per frame). Full chunks are rolled to disk as .npz files, while colour
+# transitions are kept in a small in-memory index so range queries and
+# latency statistics never have to scan every frame.
+
+import os
+import threading
+
+import numpy as np
+
+from colors import COLOR_CODES, COLOR_NAMES, NONE
+
+
+class EventTimeline:
+    """Per-frame timestamp, class, confidence and latency columns"""
+
+    def __init__(self, out_dir=None, chunk_size=65536, transition_capacity=1024):
+        self.out_dir = out_dir
+        self.chunk_size = chunk_size
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+        # Current chunk, reused after every roll
+        self.t = np.empty(chunk_size, np.float64)
+        self.cls = np.empty(chunk_size, np.int8)
+        self.conf = np.empty(chunk_size, np.float32)
+        self.latency = np.empty(chunk_size, np.float32)
+        self.fill = 0
+        self.chunks_written = 0
+        self.frames = 0
+
+        # Running totals so means are O(1)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+
+        # Transition index (rare events, grown by doubling)
+        self._lock = threading.Lock()
+        self.tr_t = np.empty(transition_capacity, np.float64)
+        self.tr_from = np.empty(transition_capacity, np.int8)
+        self.tr_to = np.empty(transition_capacity, np.int8)
+        self.tr_frame = np.empty(transition_capacity, np.int64)
+        self.tr_reaction = np.empty(transition_capacity, np.float32)
+        self.tr_count = 0
+        self.last_cls = NONE
+        self.last_color_cls = NONE
+
+    def record(self, t, color, confidence=np.nan, latency=np.nan):
+        """Append one frame result; color is a name like "RED" or a code"""
+        code = COLOR_CODES[color] if isinstance(color, str) else int(color)
+        i = self.fill
+        self.t[i] = t
+        self.cls[i] = code
+        self.conf[i] = confidence
+        self.latency[i] = latency
+        if latency == latency:  # skip NaN
+            self.latency_sum += latency
+            self.latency_count += 1
+
+        # Index changes between real colours; NONE gaps do not count
+        if code != NONE and code != self.last_color_cls:
+            self._add_transition(t, self.last_color_cls, code)
+            self.last_color_cls = code
+        self.last_cls = code
+
+        self.fill += 1
+        self.frames += 1
+        if self.fill == self.chunk_size:
+            self.roll()
+
+    def _add_transition(self, t, from_code, to_code):
+        with self._lock:
+            n = self.tr_count
+            if n == len(self.tr_t):
+                for name in ("tr_t", "tr_from", "tr_to", "tr_frame", "tr_reaction"):
+                    old = getattr(self, name)
+                    grown = np.empty(len(old) * 2, old.dtype)
+                    grown[:n] = old[:n]
+                    setattr(self, name, grown)
+            self.tr_t[n] = t
+            self.tr_from[n] = from_code
+            self.tr_to[n] = to_code
+            self.tr_frame[n] = self.frames
+            self.tr_reaction[n] = np.nan
+            self.tr_count = n + 1
+
+    def announce(self, t, color):
+        """Mark when the announcement for the latest transition to color started"""
+        code = COLOR_CODES[color] if isinstance(color, str) else int(color)
+        with self._lock:
+            n = self.tr_count
+            if n and self.tr_to[n - 1] == code and self.tr_reaction[n - 1] != self.tr_reaction[n - 1]:
+                self.tr_reaction[n - 1] = t - self.tr_t[n - 1]
+
+    def roll(self):
+        """Write the current chunk to disk (if configured) and start a new one"""
+        if self.fill == 0:
+            return
+        if self.out_dir:
+            path = os.path.join(self.out_dir, f"frames_{self.chunks_written:05d}.npz")
+            n = self.fill
+            np.savez(path, t=self.t[:n], cls=self.cls[:n],
+                     conf=self.conf[:n], latency=self.latency[:n])
+        self.chunks_written += 1
+        self.fill = 0
+
+    def close(self):
+        """Flush the partial chunk and the transition index"""
+        self.roll()
+        if self.out_dir:
+            path = os.path.join(self.out_dir, "transitions.npz")
+            np.savez(path, **self._transition_columns(slice(0, self.tr_count)))
+
+    def _transition_columns(self, index):
+        return {
+            "t": self.tr_t[index],
+            "from": self.tr_from[index],
+            "to": self.tr_to[index],
+            "frame": self.tr_frame[index],
+            "reaction": self.tr_reaction[index],
+        }
+
+    def transitions(self, from_color=None, to_color=None, t1=None, t2=None):
+        """Transitions in [t1, t2), optionally filtered by colours
+
+        e.g. timeline.transitions("RED", "GREEN", t1, t2)
+        """
+        n = self.tr_count
+        times = self.tr_t[:n]
+        lo = 0 if t1 is None else int(np.searchsorted(times, t1, "left"))
+        hi = n if t2 is None else int(np.searchsorted(times, t2, "left"))
+        mask = np.ones(hi - lo, bool)
+        if from_color is not None:
+            mask &= self.tr_from[lo:hi] == COLOR_CODES[from_color]
+        if to_color is not None:
+            mask &= self.tr_to[lo:hi] == COLOR_CODES[to_color]
+        index = np.arange(lo, hi)[mask]
+        return self._transition_columns(index)
+
+    def mean_latency(self):
+        """Mean per-frame processing latency over the whole run"""
+        if not self.latency_count:
+            return float("nan")
+        return self.latency_sum / self.latency_count
+
+    def mean_reaction_latency(self, from_color=None, to_color=None, t1=None, t2=None):
+        """Mean time from a transition to its announcement"""
+        reaction = self.transitions(from_color, to_color, t1, t2)["reaction"]
+        reaction = reaction[~np.isnan(reaction)]
+        if not len(reaction):
+            return float("nan")
+        return float(reaction.mean())
+
+    def summary(self):
+        """One line per transition type, for the console"""
+        n = self.tr_count
+        lines = [f"📈 {self.frames} frames, {n} transitions, "
+                 f"mean latency {self.mean_latency() * 1000:.1f} ms"]
+        pairs = set(zip(self.tr_from[:n].tolist(), self.tr_to[:n].tolist()))
+        for from_code, to_code in sorted(pairs):
+            a, b = COLOR_NAMES[from_code], COLOR_NAMES[to_code]
+            count = len(self.transitions(a, b)["t"])
+            reaction = self.mean_reaction_latency(a, b)
+            lines.append(f"   {a} -> {b}: {count}x, reaction {reaction * 1000:.0f} ms")
+        return "\n".join(lines)